@@ -1,15 +1,18 @@
 # filename: app/main.py
 
+import asyncio
 import os
 import shutil
+import tempfile
 import traceback
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, Literal, Union
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Query
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 
 import fitz  # For PyMuPDF operations
 
@@ -17,7 +20,7 @@ from .core.utils import get_file_extension
 from .core.constants import SUPPORTED_IMAGE_EXTENSIONS
 
 from .processing.docx_processor import process_docx_file
-from .processing.pdf_processor import process_pdf_file
+from .processing.pdf_processor import process_pdf_file, MUPDF_LOCK
 from .processing.image_processor import process_image_file
 
 from .output_formatters.to_plain_text import format_to_plain_text
@@ -36,19 +39,38 @@ app = FastAPI(
 )
 
 static_content_dir = os.path.join(APP_DIR, "static")
-if not os.path.exists(static_content_dir):
-    os.makedirs(static_content_dir)
+os.makedirs(static_content_dir, exist_ok=True)
 app.mount("/static", StaticFiles(directory=static_content_dir), name="static")
 
 templates_dir = os.path.join(APP_DIR, "templates")
 templates = Jinja2Templates(directory=templates_dir)
 
 PROJECT_UPLOAD_DIRECTORY = os.path.join(PROJECT_ROOT_DIR, "temp_uploads")
-if not os.path.exists(PROJECT_UPLOAD_DIRECTORY):
-    os.makedirs(PROJECT_UPLOAD_DIRECTORY)
+os.makedirs(PROJECT_UPLOAD_DIRECTORY, exist_ok=True)
 
 PDF_OCR_FALLBACK_MIN_TEXT_THRESHOLD = 100
 
+# Upper bound on PDF jobs handed to the threadpool at once. MuPDF work itself is serialized by
+# MUPDF_LOCK (PyMuPDF is not thread-safe), so the default is 1; raising it only lets result-cache
+# hits and file hashing overlap with a parse, at the cost of threads parked on the lock.
+PDF_MAX_CONCURRENT = max(1, min(os.cpu_count() or 1, int(os.environ.get("PDF_MAX_CONCURRENT", "1"))))
+pdf_processing_semaphore = asyncio.Semaphore(PDF_MAX_CONCURRENT)
+
+
+async def process_pdf_file_bounded(file_path: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs process_pdf_file in the threadpool, limited to PDF_MAX_CONCURRENT jobs at once."""
+    async with pdf_processing_semaphore:
+        return await run_in_threadpool(process_pdf_file, file_path, settings=settings)
+
+
+def render_pdf_page_png(file_path: str, page_index: int, image_path: str, dpi: int = 300) -> bool:
+    """Renders one PDF page to a PNG under MUPDF_LOCK; returns False if the PDF has no pages."""
+    with MUPDF_LOCK, fitz.open(file_path) as pdf_doc_fitz:
+        if len(pdf_doc_fitz) == 0:
+            return False
+        pdf_doc_fitz.load_page(page_index).get_pixmap(dpi=dpi).save(image_path)
+        return True
+
 
 @app.get("/", response_class=HTMLResponse, include_in_schema=False)
 async def read_root(request: Request):
@@ -71,6 +93,7 @@ async def get_status():
 
 @app.post("/process/document/",
           response_model=Union[DocumentJSONResponse, OCRJSONResponse, TextResponseContent],
+          response_class=ORJSONResponse,
           summary="Process DOCX, PDF, or Image files")
 async def process_document_endpoint(
         request: Request,
@@ -119,7 +142,11 @@ async def process_document_endpoint(
     original_filename = file.filename if file.filename else "unknown_file.tmp"
     file_extension = get_file_extension(original_filename)
     temp_safe_filename = os.path.basename(original_filename)
-    file_path = os.path.join(PROJECT_UPLOAD_DIRECTORY, temp_safe_filename)
+    # Each request gets its own directory: the endpoint awaits while the upload sits on disk, so a
+    # shared temp_uploads/<filename> would let concurrent uploads with the same name overwrite
+    # (and delete) each other's files.
+    request_upload_dir = tempfile.mkdtemp(dir=PROJECT_UPLOAD_DIRECTORY)
+    file_path = os.path.join(request_upload_dir, temp_safe_filename)
 
     processed_data: Optional[Dict[str, Any]] = None
     pdf_processing_method_indication: Optional[Literal["direct_text_extraction", "ocr_extraction"]] = None
@@ -146,7 +173,7 @@ async def process_document_endpoint(
                 "text_tolerance": pdf_text_tolerance,
                 "remove_empty_rows": pdf_remove_empty_rows,
             }
-            direct_pdf_data = process_pdf_file(file_path, settings=pdf_extraction_settings)
+            direct_pdf_data = await process_pdf_file_bounded(file_path, settings=pdf_extraction_settings)
             extracted_text_direct = direct_pdf_data.get("text_with_placeholders", "")
 
             processed_data = direct_pdf_data
@@ -157,19 +184,14 @@ async def process_document_endpoint(
                     f"Direct text extraction for PDF '{original_filename}' yielded less than {PDF_OCR_FALLBACK_MIN_TEXT_THRESHOLD} chars. Attempting OCR fallback for first page.")
                 temp_ocr_image_path = None
                 try:
-                    pdf_doc_fitz = fitz.open(file_path)
-                    if len(pdf_doc_fitz) > 0:
-                        page_to_ocr_idx = 0
-                        page_to_ocr = pdf_doc_fitz.load_page(page_to_ocr_idx)
-
-                        base_fn, _ = os.path.splitext(temp_safe_filename)
-                        temp_ocr_image_filename = f"{base_fn}_ocr_page_{page_to_ocr_idx}.png"
-                        temp_ocr_image_path = os.path.join(PROJECT_UPLOAD_DIRECTORY, temp_ocr_image_filename)
-
-                        pix = page_to_ocr.get_pixmap(dpi=300)
-                        pix.save(temp_ocr_image_path)
-                        pdf_doc_fitz.close()
-
+                    page_to_ocr_idx = 0
+                    base_fn, _ = os.path.splitext(temp_safe_filename)
+                    temp_ocr_image_filename = f"{base_fn}_ocr_page_{page_to_ocr_idx}.png"
+                    temp_ocr_image_path = os.path.join(request_upload_dir, temp_ocr_image_filename)
+                    pdf_has_pages = await run_in_threadpool(render_pdf_page_png, file_path, page_to_ocr_idx,
+                                                            temp_ocr_image_path)
+
+                    if pdf_has_pages:
                         print(
                             f"Performing OCR on page {page_to_ocr_idx} of '{original_filename}' saved as '{temp_ocr_image_path}'.")
                         ocr_result_data = process_image_file(temp_ocr_image_path, settings=ocr_extraction_settings)
@@ -259,11 +281,10 @@ async def process_document_endpoint(
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail="An unexpected error occurred during document processing.")
     finally:
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except OSError as e_os:
-                print(f"Error deleting main temporary file {file_path}: {str(e_os)}")
+        try:
+            shutil.rmtree(request_upload_dir)
+        except OSError as e_os:
+            print(f"Error deleting temporary upload directory {request_upload_dir}: {str(e_os)}")
 
 
 if __name__ == "__main__":
@@ -106,7 +106,7 @@ def preprocess_image_for_ocr(
         processed_cv_img_for_binarization = cv2.cvtColor(cv_img_bgr_after_osd, cv2.COLOR_BGR2GRAY)
 
         debug_dir = os.path.join(os.path.dirname(image_path), "DEBUG_IMAGES")
-        if not os.path.exists(debug_dir): os.makedirs(debug_dir)
+        os.makedirs(debug_dir, exist_ok=True)
         try:
             img_after_osd_path = os.path.join(debug_dir, "OSD_ROTATED_" + os.path.basename(image_path))
             Image.fromarray(cv2.cvtColor(cv_img_bgr_after_osd, cv2.COLOR_BGR2RGB)).save(img_after_osd_path)
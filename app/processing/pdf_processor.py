@@ -1,15 +1,105 @@
 import fitz  # PyMuPDF
+import copy
+import hashlib
 import os
-from typing import Dict, List, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, Union
 
 INTERNAL_DEFAULT_PDF_TABLE_STRATEGY = "lines_strict"
 DEFAULT_PDF_TEXT_TOLERANCE = 3
+VALID_PDF_TABLE_STRATEGIES = frozenset({"text", "lines", "lines_strict"})
 
+# Results of recent runs, keyed by (SHA-256 of the file bytes, extraction settings).
+# Identical re-uploads (client retries, regression runs) skip MuPDF entirely.
+PDF_RESULT_CACHE_MAXSIZE = 64
+_pdf_result_cache: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = OrderedDict()
+_pdf_result_cache_lock = threading.Lock()
 
-def process_pdf_file(file_path: str, settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+# PyMuPDF is not thread-safe: find_tables keeps its working state (CHARS, EDGES, TEXTPAGE) in
+# module-level globals in pymupdf/table.py, so two documents processed at once corrupt each
+# other's tables. Every use of fitz in this process (including the API's OCR page render) must
+# hold this lock; only one document is ever inside MuPDF at a time.
+MUPDF_LOCK = threading.Lock()
+
+
+def _cell_to_str(cell: Any, _str=str) -> str:
+    """Coerces a table cell from fitz Table.extract() to str; None (merged/empty cells) becomes ""."""
+    if cell is None:
+        return ""
+    return cell if cell.__class__ is _str else _str(cell)
+
+
+def _postprocess_table(raw_rows: List[List[Any]], remove_empty_rows: bool) -> Tuple[List[str], List[List[str]]]:
+    """
+    Turns the raw rows of one extracted table into (headers, data rows).
+
+    Cells are coerced to str, fully blank rows are dropped when remove_empty_rows is set,
+    and the first remaining row is used as the header row.
+    """
+    processed_rows = [list(map(_cell_to_str, r_row)) for r_row in raw_rows]
+
+    if remove_empty_rows:
+        processed_rows = [row for row in processed_rows if any(cell.strip() for cell in row)]
+
+    if not processed_rows:
+        return [], []
+    return processed_rows[0], processed_rows[1:]
+
+
+def _page_has_ruling_lines(page: fitz.Page) -> bool:
+    """True if the page draws any line, rectangle or quad, the only paths find_tables turns into edges."""
+    for path in page.get_cdrawings():
+        for item in path["items"]:
+            if item[0] in ("l", "re", "qu"):
+                return True
+    return False
+
+
+def _open_pdf(file_path: Union[str, bytes], pdf_bytes: Optional[bytes]) -> fitz.Document:
+    return fitz.open(stream=pdf_bytes, filetype="pdf") if pdf_bytes is not None else fitz.open(file_path)
+
+
+def _file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _get_cached_result(cache_key: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+    with _pdf_result_cache_lock:
+        cached = _pdf_result_cache.get(cache_key)
+        if cached is not None:
+            _pdf_result_cache.move_to_end(cache_key)
+    return copy.deepcopy(cached) if cached is not None else None
+
+
+def _store_cached_result(cache_key: Tuple[Any, ...], result: Dict[str, Any]) -> None:
+    with _pdf_result_cache_lock:
+        _pdf_result_cache[cache_key] = copy.deepcopy(result)
+        _pdf_result_cache.move_to_end(cache_key)
+        while len(_pdf_result_cache) > PDF_RESULT_CACHE_MAXSIZE:
+            _pdf_result_cache.popitem(last=False)
+
+
+def process_pdf_file(file_path: Union[str, bytes], settings: Optional[Dict[str, Any]] = None,
+                     source_basename: Optional[str] = None) -> Dict[str, Any]:
     if settings is None:
         settings = {}
 
+    # file_path may also be the raw PDF bytes (already in memory); source_basename then names the
+    # document in the result and in messages, and otherwise defaults to the path's basename.
+    pdf_bytes = file_path if isinstance(file_path, bytes) else None
+    if source_basename is None:
+        source_basename = os.path.basename(file_path) if pdf_bytes is None else "document.pdf"
+    source_label = file_path if pdf_bytes is None else source_basename
+    if pdf_bytes is None and not os.path.isfile(file_path):
+        error_message = f"Error processing PDF file {file_path}: File not found."
+        print(error_message)
+        raise ValueError(error_message)
+
     # Get settings from API call, or use internal defaults for this processor
     # The API 'main.py' now defaults pdf_table_strategy to "lines_strict"
     # So settings.get("table_strategy") will usually be "lines_strict" if not specified by client
@@ -18,111 +108,113 @@ def process_pdf_file(file_path: str, settings: Optional[Dict[str, Any]] = None)
     text_tolerance_setting = settings.get("text_tolerance")
     remove_empty_rows_setting = settings.get("remove_empty_rows", False)
 
+    # The find_tables options do not depend on the page, so resolve them once per document.
+    find_tables_options: Dict[str, Any] = {}
+
+    # Interpret the strategy from API
+    if table_strategy_api_value == "pymupdf_default":
+        # Don't pass any strategy, let PyMuPDF use its library default
+        pass
+    elif table_strategy_api_value in VALID_PDF_TABLE_STRATEGIES:
+        find_tables_options["strategy"] = table_strategy_api_value
+    else:  # Fallback to our internal default if an unexpected value somehow gets here
+        find_tables_options["strategy"] = INTERNAL_DEFAULT_PDF_TABLE_STRATEGY
+
+    # Apply text_tolerance only if the strategy is 'text' (or if it's generally applicable)
+    # PyMuPDF's text_tolerance is mainly for 'text' strategy but might not hurt others if set.
+    if text_tolerance_setting is not None:
+        # Ensure it's an int for PyMuPDF
+        find_tables_options["text_tolerance"] = int(text_tolerance_setting)
+
+    # The "lines" strategies (also PyMuPDF's default) only build tables from vector line/rect
+    # paths, so pages without any such paths can skip find_tables altogether.
+    tables_need_ruling_lines = find_tables_options.get("strategy", "lines").startswith("lines")
+
     try:
-        doc = fitz.open(file_path)
-        # ... (tables_data_list, table_count_in_doc, full_page_text_with_placeholders_parts setup) ...
+        content_sha256 = hashlib.sha256(pdf_bytes).hexdigest() if pdf_bytes is not None else _file_sha256(file_path)
+        cache_key = (content_sha256, table_strategy_api_value, text_tolerance_setting,
+                     bool(remove_empty_rows_setting))
+        cached_result = _get_cached_result(cache_key)
+        if cached_result is not None:
+            cached_result["source_basename"] = source_basename
+            return cached_result
+
         tables_data_list: List[Dict[str, Any]] = []
         table_count_in_doc = 0
         full_page_text_with_placeholders_parts = []
 
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text_blocks = page.get_text("blocks", sort=True)
-
-            find_tables_options = {}
-
-            # Interpret the strategy from API
-            if table_strategy_api_value == "pymupdf_default":
-                # Don't pass any strategy, let PyMuPDF use its library default
-                pass
-            elif table_strategy_api_value in ["text", "lines", "lines_strict"]:
-                find_tables_options["strategy"] = table_strategy_api_value
-            else:  # Fallback to our internal default if an unexpected value somehow gets here
-                find_tables_options["strategy"] = INTERNAL_DEFAULT_PDF_TABLE_STRATEGY
-
-            # Apply text_tolerance only if the strategy is 'text' (or if it's generally applicable)
-            # PyMuPDF's text_tolerance is mainly for 'text' strategy but might not hurt others if set.
-            if text_tolerance_setting is not None:
-                # Ensure it's an int for PyMuPDF
-                find_tables_options["text_tolerance"] = int(text_tolerance_setting)
-
-            print(f"DEBUG: PyMuPDF find_tables options for page {page_num}: {find_tables_options}")
-            table_finder = page.find_tables(**find_tables_options)
-
-            # ... (rest of the PDF processing logic for elements, text, tables, and rows remains the same as before) ...
-            # ... (ensure the post-processing for remove_empty_rows is still there) ...
-            page_elements = []
-            for x0, y0, x1, y1, text_content, block_no, block_type in text_blocks:
-                if block_type == 0:
+        print(f"DEBUG: PyMuPDF find_tables options for {source_basename}: {find_tables_options}")
+        # MUPDF_LOCK is taken after the cache lookup, so cache hits never wait behind a parse.
+        with MUPDF_LOCK, _open_pdf(file_path, pdf_bytes) as doc:
+            for page_num in range(len(doc)):
+                page = doc.load_page(page_num)
+                text_blocks = page.get_text("blocks", sort=True)
+                if tables_need_ruling_lines and not _page_has_ruling_lines(page):
+                    table_finder = []
+                else:
+                    table_finder = page.find_tables(**find_tables_options)
+
+                page_elements = []
+                for x0, y0, x1, y1, text_content, block_no, block_type in text_blocks:
+                    if block_type == 0:
+                        page_elements.append({
+                            "type": "text", "bbox": (x0, y0, x1, y1),
+                            "content": text_content.strip(), "y_start": y0
+                        })
+
+                current_page_table_index = 0
+                for fitz_table_obj in table_finder:
+                    table_count_in_doc += 1
+                    table_id = f"table{table_count_in_doc:03d}"
                     page_elements.append({
-                        "type": "text", "bbox": (x0, y0, x1, y1),
-                        "content": text_content.strip(), "y_start": y0
+                        "type": "table_placeholder", "bbox": fitz_table_obj.bbox,
+                        "id": table_id, "fitz_table_obj": fitz_table_obj,
+                        "y_start": fitz_table_obj.bbox[1], "page_table_index": current_page_table_index
                     })
-
-            current_page_table_index = 0
-            for fitz_table_obj in table_finder:
-                table_count_in_doc += 1
-                table_id = f"table{table_count_in_doc:03d}"
-                page_elements.append({
-                    "type": "table_placeholder", "bbox": fitz_table_obj.bbox,
-                    "id": table_id, "fitz_table_obj": fitz_table_obj,
-                    "y_start": fitz_table_obj.bbox[1], "page_table_index": current_page_table_index
-                })
-                current_page_table_index += 1
-
-            page_elements.sort(key=lambda el: (el["y_start"], el["bbox"][0]))
-
-            current_page_text_parts = []
-            for element in page_elements:
-                if element["type"] == "text":
-                    if element["content"]:
-                        current_page_text_parts.append(element["content"])
-                elif element["type"] == "table_placeholder":
-                    table_id = element["id"]
-                    fitz_table_obj = element["fitz_table_obj"]
-                    current_page_text_parts.append(f"\n[[INSERT_TABLE:{table_id}]]\n")
-
-                    raw_extracted_rows: List[List[str | None]] = fitz_table_obj.extract() or []
-
-                    processed_rows = [[str(cell) if cell is not None else "" for cell in r_row] for r_row in
-                                      raw_extracted_rows]
-
-                    if remove_empty_rows_setting:
-                        processed_rows = [row for row in processed_rows if any(cell.strip() for cell in row)]
-
-                    table_headers: List[str] = []
-                    table_actual_data: List[List[str]] = []
-                    if processed_rows:
-                        table_headers = processed_rows[0]
-                        table_actual_data = processed_rows[1:]
-
-                    table_detail = {
-                        "id": table_id, "position": len(tables_data_list) + 1,
-                        "caption": None, "headers": table_headers, "data": table_actual_data,
-                        "page_number": page_num + 1
-                    }
-                    tables_data_list.append(table_detail)
-
-            if current_page_text_parts:
-                full_page_text_with_placeholders_parts.append("\n".join(current_page_text_parts))
+                    current_page_table_index += 1
+
+                page_elements.sort(key=lambda el: (el["y_start"], el["bbox"][0]))
+
+                current_page_text_parts = []
+                for element in page_elements:
+                    if element["type"] == "text":
+                        if element["content"]:
+                            current_page_text_parts.append(element["content"])
+                    elif element["type"] == "table_placeholder":
+                        table_id = element["id"]
+                        fitz_table_obj = element["fitz_table_obj"]
+                        current_page_text_parts.append(f"\n[[INSERT_TABLE:{table_id}]]\n")
+
+                        raw_extracted_rows: List[List[str | None]] = fitz_table_obj.extract() or []
+                        table_headers, table_actual_data = _postprocess_table(raw_extracted_rows,
+                                                                              remove_empty_rows_setting)
+
+                        table_detail = {
+                            "id": table_id, "position": len(tables_data_list) + 1,
+                            "caption": None, "headers": table_headers, "data": table_actual_data,
+                            "page_number": page_num + 1
+                        }
+                        tables_data_list.append(table_detail)
+
+                if current_page_text_parts:
+                    full_page_text_with_placeholders_parts.append("\n".join(current_page_text_parts))
 
         final_text = "\n\n".join(full_page_text_with_placeholders_parts)
         final_text = final_text.replace('\n\n\n', '\n\n').strip()
 
-        return {
+        result = {
             "text_with_placeholders": final_text,
             "tables_data": tables_data_list,
-            "source_basename": os.path.basename(file_path)
+            "source_basename": source_basename
         }
+        _store_cached_result(cache_key, result)
+        return result
 
-    # ... (exception handling) ...
-    except fitz.fitz.FileNotFoundError as fnfe:
-        error_message = f"Error processing PDF file {file_path}: File not found. ({str(fnfe)})"
+    except (FileNotFoundError, fitz.FileNotFoundError) as fnfe:
+        error_message = f"Error processing PDF file {source_label}: File not found. ({str(fnfe)})"
         print(error_message)
         raise ValueError(error_message)
     except Exception as e:
-        error_message = f"Error processing PDF file {file_path}: {type(e).__name__} - {str(e)}"
+        error_message = f"Error processing PDF file {source_label}: {type(e).__name__} - {str(e)}"
         print(error_message)
         raise ValueError(error_message)
-
-# Remove or comment out the __main__ block for this file if not being used for direct testing.
\ No newline at end of file
@@ -0,0 +1,103 @@
+# tests/conftest.py
+# Shared fixtures for the whole test session.
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Tuple
+
+import httpx
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from .docx_test_utils import build_sample_docx_bytes
+
+TESTS_DIR = Path(__file__).parent
+
+# conftest.py is imported before any test module, so the app (router build, OpenAPI setup)
+# is imported and the path adjusted exactly once; API tests use the client or asgi_app fixture.
+try:
+    from app.main import app
+except ModuleNotFoundError:
+    sys.path.insert(0, str(TESTS_DIR.resolve().parent))
+    from app.main import app
+
+
+@pytest.fixture(scope="session", autouse=True)
+def orjson_response_decoding():
+    """Decodes TestClient response bodies with orjson; calls passing json.loads kwargs keep the stdlib path."""
+    stdlib_json = httpx.Response.json
+
+    def fast_json(self, **kwargs):
+        if kwargs:
+            return stdlib_json(self, **kwargs)
+        return orjson.loads(self.content)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(httpx.Response, "json", fast_json)
+        yield
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient shared by every API test, so app startup/shutdown runs once per session."""
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def asgi_app(monkeypatch):
+    """
+    The app for tests that drive it through httpx.ASGITransport on their own event loop.
+
+    pdf_processing_semaphore binds to the first loop that waits on it, so each test gets a
+    fresh one instead of sharing the module-level semaphore with the TestClient's loop.
+    """
+    from app import main
+    monkeypatch.setattr(main, "pdf_processing_semaphore", asyncio.Semaphore(main.PDF_MAX_CONCURRENT))
+    return app
+
+
+@pytest.fixture(scope="session")
+def fixtures_dir(tmp_path_factory):
+    """Per-session temporary directory for generated fixture files; pytest handles cleanup."""
+    return tmp_path_factory.mktemp("fixtures")
+
+
+@pytest.fixture(scope="session")
+def sample_docx_bytes() -> bytes:
+    """The shared SAMPLE_DOCX_SPEC document, serialized once per session; tests reuse the raw bytes."""
+    return build_sample_docx_bytes()
+
+
+# Sample PDFs are checked in so normal runs never rebuild them.
+SAMPLE_PDF_DIR = TESTS_DIR / "fixtures" / "pdfs"
+
+# create_sample_pdf_for_test content_type -> checked-in file name, for each sample PDF.
+SAMPLE_PDFS = {
+    "text_only": "sample_text_only.pdf",
+    "text_and_table": "sample_with_table.pdf",
+    "multiple_tables": "sample_multiple_tables.pdf",
+}
+
+
+@pytest.fixture(scope="session", params=list(SAMPLE_PDFS))
+def sample_pdf(request) -> Tuple[str, bytes]:
+    """
+    (file name, bytes) of one checked-in sample PDF under tests/fixtures/pdfs, read once per session.
+
+    Runs for every sample by default; a test selects variants by content_type with
+    @pytest.mark.parametrize("sample_pdf", ["text_only"], indirect=True).
+    With REGENERATE_PDF_FIXTURES=1 the file is rebuilt with PyMuPDF first (run with -n 0
+    so xdist workers don't write the same files concurrently).
+    """
+    content_type = request.param
+    filename = SAMPLE_PDFS[content_type]
+    file_path = SAMPLE_PDF_DIR / filename
+    if os.environ.get("REGENERATE_PDF_FIXTURES") == "1":
+        from .pdf_test_utils import create_sample_pdf_for_test
+        SAMPLE_PDF_DIR.mkdir(parents=True, exist_ok=True)
+        create_sample_pdf_for_test(str(file_path), content_type)
+    assert file_path.exists(), f"Missing {file_path}; run with REGENERATE_PDF_FIXTURES=1 to create it."
+    return filename, file_path.read_bytes()
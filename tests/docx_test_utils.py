@@ -0,0 +1,71 @@
+from io import BytesIO
+from typing import Any, Dict, List
+from xml.sax.saxutils import escape
+
+from docx import Document as CreateDoc
+from docx.document import Document as DocObject
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+# Content of the shared sample DOCX used by both the processor and the API tests.
+# The body is laid out as paragraph, table, paragraph, table, paragraph; the first row of
+# each table is what the processor reports as headers, the remaining rows as data.
+SAMPLE_DOCX_SPEC: Dict[str, Any] = {
+    "paragraphs": [
+        "DOCX Test: Para 1.",
+        "DOCX Test: Para 2, between tables.",
+        "DOCX Test: Para 3.",
+    ],
+    "tables": [
+        [["Name", "Age"], ["Alice", "30"]],
+        [["Note"]],
+    ],
+}
+
+
+def _cell_xml(text: str) -> str:
+    paragraph = f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>' if text else "<w:p/>"
+    return f'<w:tc><w:tcPr><w:tcW w:type="auto" w:w="0"/></w:tcPr>{paragraph}</w:tc>'
+
+
+def add_table_fast(doc: DocObject, rows_of_cells: List[List[str]]) -> None:
+    """
+    Appends a table to the end of the document body in one step.
+
+    Builds the whole <w:tbl> element as a single XML fragment and parses it once, instead of
+    python-docx's add_table() followed by one lxml mutation per `cell(i, j).text = ...`.
+    Produces the same structure python-docx reads back via document.tables / cell.text.
+    """
+    col_count = max((len(row) for row in rows_of_cells), default=0)
+    grid_xml = "<w:gridCol/>" * col_count
+    rows_xml = "".join(
+        "<w:tr>" + "".join(_cell_xml(text) for text in row) + "</w:tr>" for row in rows_of_cells
+    )
+    tbl = parse_xml(
+        f'<w:tbl {nsdecls("w")}>'
+        f'<w:tblPr><w:tblW w:type="auto" w:w="0"/></w:tblPr>'
+        f'<w:tblGrid>{grid_xml}</w:tblGrid>'
+        f'{rows_xml}'
+        f'</w:tbl>'
+    )
+
+    body = doc.element.body
+    if body.sectPr is not None:
+        # Block content must stay ahead of the trailing section properties.
+        body.sectPr.addprevious(tbl)
+    else:
+        body.append(tbl)
+
+
+def build_sample_docx_bytes(spec: Dict[str, Any] = SAMPLE_DOCX_SPEC) -> bytes:
+    """Builds the DOCX described by spec (paragraphs interleaved with tables) and returns its bytes."""
+    doc = CreateDoc()
+    paragraphs = spec["paragraphs"]
+    tables = spec["tables"]
+    for index, paragraph in enumerate(paragraphs):
+        doc.add_paragraph(paragraph)
+        if index < len(tables):
+            add_table_fast(doc, tables[index])
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
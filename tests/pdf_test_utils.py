@@ -1,69 +1,115 @@
 import os
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
 
+import fitz  # PyMuPDF
+import pytest
 
-def create_structured_pdf(file_path: str, content_scenario: str = "text_and_one_table"):
+
+# --- Sample PDFs for the pdf_processor unit tests (checked in under tests/fixtures/pdfs) ---
+# content_type -> blocks laid out top to bottom on a Letter page: a str is a line of text, a list of
+# rows is a table drawn as a ruled grid (first row = headers) so find_tables' "lines" strategy finds it.
+SAMPLE_PDF_CONTENT = {
+    "text_only": [
+        "PDF Test: Simple text line 1.",
+        "PDF Test: Simple text line 2.",
+    ],
+    "text_and_table": [
+        "PDF Test: Text before table.",
+        [["HeaderA", "HeaderB"], ["Data1A", "Data1B"], ["Data2A", "Data2B"]],
+        "PDF Test: Text after table.",
+    ],
+    "multiple_tables": [
+        "PDF Test: Text before table 1.",
+        [["T1H1", "T1H2"], ["T1D1", "T1D2"]],
+        "PDF Test: Text between tables.",
+        [["T2H1", "T2H2"], ["T2D1", "T2D2"]],
+        "PDF Test: Text after table 2.",
+    ],
+}
+
+_SAMPLE_LEFT = 72  # 1 inch margin, in points
+_SAMPLE_LINE_HEIGHT = 24
+_SAMPLE_CELL_WIDTH = 100
+_SAMPLE_ROW_HEIGHT = 20
+
+
+def _draw_ruled_table(page, top: float, rows) -> float:
+    """Draws rows as a grid of ruled cells starting at top; returns the y just below the table."""
+    col_count = max(len(row) for row in rows)
+    right = _SAMPLE_LEFT + col_count * _SAMPLE_CELL_WIDTH
+    bottom = top + len(rows) * _SAMPLE_ROW_HEIGHT
+    for row_index in range(len(rows) + 1):
+        y = top + row_index * _SAMPLE_ROW_HEIGHT
+        page.draw_line((_SAMPLE_LEFT, y), (right, y))
+    for col_index in range(col_count + 1):
+        x = _SAMPLE_LEFT + col_index * _SAMPLE_CELL_WIDTH
+        page.draw_line((x, top), (x, bottom))
+    for row_index, row in enumerate(rows):
+        baseline = top + row_index * _SAMPLE_ROW_HEIGHT + 14
+        for col_index, text in enumerate(row):
+            page.insert_text((_SAMPLE_LEFT + col_index * _SAMPLE_CELL_WIDTH + 4, baseline), text,
+                             fontname="helv", fontsize=10)
+    return bottom
+
+
+def build_sample_pdf_bytes(pages) -> bytes:
     """
-    Creates a PDF with more structured content, including Platypus Tables.
+    Builds a Letter-size PDF with PyMuPDF and returns its bytes.
+
+    pages is a list of block lists in the SAMPLE_PDF_CONTENT format, one per page. Output is
+    reproducible (no random document ID), so checked-in fixtures don't churn on regeneration.
     """
-    doc = SimpleDocTemplate(file_path, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-
-    if content_scenario == "text_only":
-        story.append(Paragraph("PDF Test: Simple text line 1.", styles['Normal']))
-        story.append(Spacer(1, 0.2 * inch))
-        story.append(Paragraph("PDF Test: Simple text line 2.", styles['Normal']))
-
-    elif content_scenario == "text_and_one_table":
-        story.append(Paragraph("PDF Test: Text before table.", styles['Normal']))
-        story.append(Spacer(1, 0.2 * inch))
-
-        data = [
-            ["Header A (Col1)", "Header B (Col2)"],
-            ["Data 1A", "Data 1B"],
-            ["Data 2A", "Data 2B"]
-        ]
-        t = Table(data)
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(t)
-        story.append(Spacer(1, 0.2 * inch))
-        story.append(Paragraph("PDF Test: Text after table.", styles['Normal']))
-
-    elif content_scenario == "multiple_tables":
-        story.append(Paragraph("PDF Test: Text before table 1.", styles['Normal']))
-        story.append(Spacer(1, 0.2 * inch))
-        data1 = [["T1H1", "T1H2"], ["T1D1", "T1D2"]]
-        t1 = Table(data1)
-        t1.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 0.5, colors.green)]))
-        story.append(t1)
-        story.append(Spacer(1, 0.2 * inch))
-
-        story.append(Paragraph("PDF Test: Text between tables.", styles['Normal']))
-        story.append(Spacer(1, 0.2 * inch))
-        data2 = [["T2H_A", "T2H_B", "T2H_C"], ["T2D_1A", "T2D_1B", "T2D_1C"]]
-        t2 = Table(data2)
-        t2.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 0.5, colors.blue)]))
-        story.append(t2)
-        story.append(Spacer(1, 0.2 * inch))
-        story.append(Paragraph("PDF Test: Text after table 2.", styles['Normal']))
-
-    else:
-        story.append(Paragraph(f"Unknown content scenario: {content_scenario}", styles['Normal']))
-
-    doc.build(story)
+    with fitz.open() as doc:
+        for blocks in pages:
+            page = doc.new_page(width=612, height=792)  # Letter
+            y = 72
+            for block in blocks:
+                if isinstance(block, str):
+                    page.insert_text((_SAMPLE_LEFT, y), block, fontname="helv", fontsize=10)
+                    y += _SAMPLE_LINE_HEIGHT
+                else:
+                    y = _draw_ruled_table(page, y - 6, block) + _SAMPLE_LINE_HEIGHT
+        return doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+
+
+def create_sample_pdf_for_test(file_path: str, content_type: str = "text_and_table"):
+    """Writes the one-page sample PDF for content_type with PyMuPDF, the same engine the processor reads it with."""
+    try:
+        pdf_bytes = build_sample_pdf_bytes([SAMPLE_PDF_CONTENT[content_type]])
+        with open(file_path, "wb") as f:
+            f.write(pdf_bytes)
+        print(f"Created sample PDF: {file_path}")
+    except Exception as e:
+        print(f"Error creating sample PDF {file_path}: {e}")
+        pytest.fail(f"Failed to create sample PDF for testing: {e}")
+
+
+# --- Structured PDFs for the API tests (generated per session into fixtures_dir) ---
+# content_scenario -> blocks, in the SAMPLE_PDF_CONTENT format.
+STRUCTURED_PDF_CONTENT = {
+    "text_only": [
+        "PDF Test: Simple text line 1.",
+        "PDF Test: Simple text line 2.",
+    ],
+    "text_and_one_table": [
+        "PDF Test: Text before table.",
+        [["Header A (Col1)", "Header B (Col2)"], ["Data 1A", "Data 1B"], ["Data 2A", "Data 2B"]],
+        "PDF Test: Text after table.",
+    ],
+    "multiple_tables": [
+        "PDF Test: Text before table 1.",
+        [["T1H1", "T1H2"], ["T1D1", "T1D2"]],
+        "PDF Test: Text between tables.",
+        [["T2H_A", "T2H_B", "T2H_C"], ["T2D_1A", "T2D_1B", "T2D_1C"]],
+        "PDF Test: Text after table 2.",
+    ],
+}
+
+
+def create_structured_pdf(file_path: str, content_scenario: str = "text_and_one_table"):
+    """Writes a one-page PDF for content_scenario, with its tables drawn as ruled grids."""
+    blocks = STRUCTURED_PDF_CONTENT.get(content_scenario, [f"Unknown content scenario: {content_scenario}"])
+    with open(file_path, "wb") as f:
+        f.write(build_sample_pdf_bytes([blocks]))
     print(f"Programmatically generated PDF: {file_path} for scenario: {content_scenario}")
 
 
@@ -72,8 +118,7 @@ if __name__ == '__main__':
     # Ensure the 'api_test_fixtures' directory exists at the root relative to this script if running directly
     # This __main__ is more for direct testing of this utility script
     fixture_dir_for_direct_test = "api_test_fixtures_generated_pdfs"
-    if not os.path.exists(fixture_dir_for_direct_test):
-        os.makedirs(fixture_dir_for_direct_test)
+    os.makedirs(fixture_dir_for_direct_test, exist_ok=True)
 
     create_structured_pdf(os.path.join(fixture_dir_for_direct_test, "generated_text_only.pdf"), "text_only")
     create_structured_pdf(os.path.join(fixture_dir_for_direct_test, "generated_one_table.pdf"), "text_and_one_table")